@@ -1,5 +1,5 @@
 from .client import LogicalReplicationClient
-from .models import Wal2JsonChange, Wal2JsonOutput
+from .models import Wal2JsonChange, Wal2JsonOutput, Wal2JsonRecord
 
-__all__ = ["LogicalReplicationClient", "Wal2JsonChange", "Wal2JsonOutput"]
+__all__ = ["LogicalReplicationClient", "Wal2JsonChange", "Wal2JsonOutput", "Wal2JsonRecord"]
 __version__ = "0.1.0"
@@ -0,0 +1,46 @@
+# cython: language_level=3
+"""Compiled counterpart of models._build_changes.
+
+Optional: models falls back to the pure-Python version when this module has
+not been built. Keep both implementations in sync.
+"""
+import sys
+
+from .models import _EMPTY_OLDKEYS, Wal2JsonChange
+
+cdef object _intern = sys.intern
+
+
+cpdef list build_changes(list raw_changes):
+    cdef Py_ssize_t i, n = len(raw_changes)
+    cdef list changes = [None] * n
+    cdef dict change
+    cdef str kind
+    cdef object oldkeys, keys, columnnames, columntypes, columnvalues
+
+    for i in range(n):
+        change = raw_changes[i]
+        kind = change["kind"]
+        oldkeys = change.get("oldkeys")
+        if kind == "insert" or kind == "update":
+            # Inserts and updates always carry the full new row; the types are
+            # left out when include-types is false
+            columnnames = change["columnnames"]
+            columntypes = change.get("columntypes", [])
+            columnvalues = change["columnvalues"]
+        else:
+            # Deletes only describe the old row through its key columns
+            keys = oldkeys or _EMPTY_OLDKEYS
+            columnnames = change.get("columnnames", keys.get("keynames", []))
+            columntypes = change.get("columntypes", keys.get("keytypes", []))
+            columnvalues = change.get("columnvalues", keys.get("keyvalues", []))
+        changes[i] = Wal2JsonChange(
+            _intern(kind),
+            _intern(change["schema"]),
+            _intern(change["table"]),
+            columnnames,
+            columntypes,
+            columnvalues,
+            oldkeys,
+        )
+    return changes
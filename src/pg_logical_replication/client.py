@@ -1,13 +1,103 @@
+import asyncio
+import inspect
 import json
+import logging
+import multiprocessing
+import queue
+import selectors
+import socket
 import threading
 import time
-from typing import Any, Callable, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 import psycopg2
 import psycopg2.extras
 
 from .models import Wal2JsonOutput
 
+logger = logging.getLogger(__name__)
+
+# Seconds between standby status updates; an idle worker wakes up at least
+# this often so psycopg2 can send them
+_STATUS_INTERVAL = 10
+
+# Seconds the socket thread waits on a full queue before checking for stop()
+# and confirming progress again
+_QUEUE_PUT_TIMEOUT = 0.5
+
+# Seconds between checks that no parse process has died
+_PROCESS_CHECK_INTERVAL = 1.0
+
+
+def _lsn_to_int(lsn: str) -> int:
+    """Convert a textual LSN such as "0/199EB170" to its 64-bit integer value."""
+    # The part before the slash holds the high 32 bits; the low part is not
+    # zero-padded, so the two halves can't simply be concatenated
+    hi, lo = lsn.split("/")
+    return (int(hi, 16) << 32) | int(lo, 16)
+
+
+def _get_json_loads(name: str) -> Callable[[bytes], Any]:
+    """Return the loads function of the JSON decoder called name."""
+    if name == "json":
+        return json.loads
+    # The faster decoders are optional extras, only import them when asked for
+    if name == "orjson":
+        import orjson
+        return orjson.loads
+    if name == "simdjson":
+        import simdjson  # type: ignore[import-not-found]
+
+        def loads(data: bytes) -> Any:
+            try:
+                return simdjson.loads(data)
+            except RuntimeError:
+                # pysimdjson raises BIGINT_ERROR for integers wider than 64
+                # bits; the stdlib decoder keeps them exact
+                return json.loads(data)
+
+        return loads
+    raise ValueError(f"Unknown JSON decoder: {name!r}")
+
+
+def _decode_wal2json(
+    data: bytes, loads: Callable[[bytes], Any] = json.loads
+) -> Optional[Wal2JsonOutput]:
+    """Decode a wal2json payload, None if it is not valid JSON."""
+    try:
+        parsed_data = loads(data)
+    except ValueError as e:
+        logger.error("Error decoding JSON: %s", e)
+        return None
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Parsed data: %s", parsed_data)
+    return Wal2JsonOutput.from_dict(parsed_data)
+
+
+def _parse_worker(
+    in_queue: "multiprocessing.Queue[Any]",
+    out_queue: "multiprocessing.Queue[Any]",
+    json_decoder: str,
+) -> None:
+    """Parse process: decode (seq, lsn, data) items until a None arrives."""
+    loads = _get_json_loads(json_decoder)
+    while True:
+        item = in_queue.get()
+        if item is None:
+            out_queue.put(None)
+            break
+        seq, lsn, data = item
+        try:
+            output = _decode_wal2json(data, loads)
+            if output is not None:
+                # Build the changes here rather than in the callback's process
+                output.change
+        except Exception as e:
+            logger.exception("Error processing message: %s", e)
+            output = None
+        out_queue.put((seq, lsn, output))
+
 
 class LogicalReplicationClient:
     def __init__(
@@ -16,42 +106,99 @@ class LogicalReplicationClient:
         slot_name: str,
         plugin: str = "wal2json",
         plugin_options: Optional[Dict[str, Any]] = None,
+        feedback_interval: float = 1.0,
+        feedback_batch_size: int = 100,
+        parse_workers: int = 0,
+        json_decoder: str = "json",
+        max_queued_messages: int = 1000,
     ):
         self.dsn = dsn
         self.slot_name = slot_name
         self.plugin = plugin
-        self.plugin_options = plugin_options or {}
+        self.plugin_options = dict(plugin_options or {})
+        # Options exactly as sent to the output plugin
+        self._normalized_plugin_options = {
+            key: str(value) for key, value in self.plugin_options.items()
+        }
+        if plugin == "wal2json":
+            # wal2json option names use dashes; other plugins, such as
+            # pgoutput with proto_version, get their names unchanged
+            self._normalized_plugin_options = {
+                key.replace("_", "-"): value
+                for key, value in self._normalized_plugin_options.items()
+            }
+            # Stream one change per message unless the caller asked otherwise
+            self._normalized_plugin_options.setdefault("format-version", "2")
+        # Feedback is sent once per feedback_batch_size messages or every
+        # feedback_interval seconds, whichever comes first
+        if feedback_batch_size < 1:
+            raise ValueError("feedback_batch_size must be at least 1")
+        if feedback_interval <= 0:
+            raise ValueError("feedback_interval must be positive")
+        self.feedback_interval = feedback_interval
+        self.feedback_batch_size = feedback_batch_size
+        # Number of processes decoding JSON for start(); 0 decodes on the consumer thread
+        self.parse_workers = parse_workers
+        # "json", "orjson" or "simdjson". The faster ones turn integers wider
+        # than 64 bits, such as big numeric values, into floats
+        self.json_decoder = json_decoder
+        self._json_loads = _get_json_loads(json_decoder)
+        # Messages read ahead of the callback; once that many are waiting the
+        # socket thread stops reading until the consumers catch up
+        if max_queued_messages < 1:
+            raise ValueError("max_queued_messages must be at least 1")
+        self.max_queued_messages = max_queued_messages
         self._conn: Optional[psycopg2.extensions.connection] = None
         self._replication_conn: Optional[psycopg2.extensions.connection] = None
-        self._callback: Optional[Callable[[str, Wal2JsonOutput], None]] = None
-        self._running = False
+        self._callback: Optional[Callable[[str, Any], None]] = None
+        # Pass undecoded payloads straight to the callback
+        self._raw = False
+        # Set by stop(); the wakeup socket interrupts a worker waiting for data
+        self._stop = threading.Event()
+        self._wakeup_r: Optional[socket.socket] = None
+        self._wakeup_w: Optional[socket.socket] = None
         self._thread: Optional[threading.Thread] = None
+        self._consumer_thread: Optional[threading.Thread] = None
+        # Payloads read from the server, waiting to be decoded: (seq, lsn, data)
+        # or None to stop. A multiprocessing queue when parse processes are used
+        self._queue: Any = queue.Queue(maxsize=max_queued_messages)
+        self._parse_processes: List[multiprocessing.process.BaseProcess] = []
+        self._result_queue: Any = None
+        # Set when a parse process died; ends the stream with this error
+        self._failure: Optional[Exception] = None
+        # LSN of the last message handed to the callback, read for feedback
+        self._last_committed_lsn = 0
+        # Feedback bookkeeping of the running stream, see _reset_feedback()
+        self._sent_lsn = 0
+        self._queued_lsn = 0
+        self._msg_count = 0
+        self._last_feedback_ts = 0.0
         self._start_lsn: Optional[int] = None
 
     def create_slot(self) -> None:
         """Create a new replication slot if it doesn't exist."""
         self._conn = psycopg2.connect(self.dsn)
         try:
-            # First check if slot exists
+            # Check for the slot and create it in a single round trip; no row
+            # comes back when the slot already exists
             with self._conn.cursor() as cur:
                 cur.execute(
-                    "SELECT * FROM pg_replication_slots WHERE slot_name = %s",
-                    (self.slot_name,)
+                    """
+                    SELECT slot_name, lsn
+                    FROM pg_create_logical_replication_slot(%(slot_name)s, %(plugin)s)
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM pg_replication_slots WHERE slot_name = %(slot_name)s
+                    )
+                    """,
+                    {"slot_name": self.slot_name, "plugin": self.plugin}
                 )
-                result = cur.fetchall()
+                slot_info = cur.fetchone()
                 
-                if not result:
-                    print(f"Creating replication slot {self.slot_name}")
-                    cur.execute(
-                        f"SELECT * FROM pg_create_logical_replication_slot('{self.slot_name}', '{self.plugin}')"
-                    )
-                    slot_info = cur.fetchone()
-                    print(f"Created replication slot: {slot_info}")
-                    # Parse LSN value from slot_info[1] which is in format "0/199EB170"
-                    lsn_parts = slot_info[1].split('/')
-                    self._start_lsn = (int(lsn_parts[0], 16) << 32) | int(lsn_parts[1], 16)
+                if slot_info:
+                    logger.info("Created replication slot: %s", slot_info)
+                    self._start_lsn = _lsn_to_int(slot_info[1])
                 else:
-                    print(f"Replication slot {self.slot_name} already exists")
+                    logger.info("Replication slot %s already exists", self.slot_name)
                 
         except psycopg2.Error as e:
             if "already exists" not in str(e):
@@ -60,94 +207,413 @@ class LogicalReplicationClient:
             self._conn.close()
             self._conn = None
 
-    def _replication_worker(self, callback: Callable[[str, Wal2JsonOutput], None]) -> None:
-        """Worker thread for handling replication messages."""
-        try:
-            # Create replication connection
-            self._replication_conn = psycopg2.connect(
-                self.dsn,
-                connection_factory=psycopg2.extras.LogicalReplicationConnection
+    def _decode_payload(self, data: bytes) -> Any:
+        """Turn a payload into the object handed to the callback, None if it is not valid JSON."""
+        if self._raw:
+            return data
+        return _decode_wal2json(data, self._json_loads)
+
+    def _consumer_worker(self, callback: Optional[Callable[[str, Any], None]]) -> None:
+        """Worker thread decoding queued payloads and invoking the callback."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            _, lsn, data = item
+
+            try:
+                payload = self._decode_payload(data)
+                if payload is None:
+                    continue
+                if callback:
+                    callback(lsn, payload)
+            except Exception as e:
+                logger.exception("Error processing message: %s", e)
+                continue
+
+            self._last_committed_lsn = lsn
+
+    def _result_worker(self, callback: Optional[Callable[[str, Any], None]]) -> None:
+        """Worker thread passing results of the parse processes to the callback in stream order."""
+        # Results that arrived ahead of an earlier message, by sequence number
+        pending: Dict[int, Any] = {}
+        next_seq = 0
+        processes = self._parse_processes
+        running = len(processes)
+        last_check_ts = time.monotonic()
+        while running:
+            now = time.monotonic()
+            if now - last_check_ts >= _PROCESS_CHECK_INTERVAL:
+                last_check_ts = now
+                # Processes exit with code 0 only after sending their None
+                exitcodes = [process.exitcode for process in processes if process.exitcode]
+                if exitcodes:
+                    # The messages it held will never come back, give up on the stream
+                    self._fail(RuntimeError(
+                        f"Parse process exited unexpectedly with code {exitcodes[0]}"
+                    ))
+                    return
+            try:
+                item = self._result_queue.get(timeout=_PROCESS_CHECK_INTERVAL)
+            except queue.Empty:
+                continue
+            if item is None:
+                running -= 1
+                continue
+            pending[item[0]] = item
+
+            while next_seq in pending:
+                _, lsn, output = pending.pop(next_seq)
+                next_seq += 1
+                # Decoding errors were already logged by the parse process
+                if output is None:
+                    continue
+                try:
+                    if callback:
+                        callback(lsn, output)
+                except Exception as e:
+                    logger.exception("Error processing message: %s", e)
+                    continue
+                self._last_committed_lsn = lsn
+
+    def _start_parse_processes(self) -> None:
+        # Forking a process that runs threads can deadlock the child, start
+        # them from a fresh interpreter instead
+        ctx = multiprocessing.get_context("spawn")
+        self._queue = ctx.Queue(self.max_queued_messages)
+        self._result_queue = ctx.Queue(self.max_queued_messages)
+        self._parse_processes = [
+            ctx.Process(
+                target=_parse_worker,
+                args=(self._queue, self._result_queue, self.json_decoder),
+                daemon=True,
             )
-            
-            # Create replication cursor
-            with self._replication_conn.cursor() as cur:
-                # Start replication
-                plugin_options = {
-                    key.replace("-", "_"): str(value)  # Convert keys to use underscores
-                    for key, value in self.plugin_options.items()
-                }
-                print(f"Starting replication with options: {plugin_options}")
-                cur.start_replication(
-                    slot_name=self.slot_name,
-                    options=plugin_options,
-                    decode=True,
-                    status_interval=10,
-                    start_lsn=self._start_lsn
-                )
+            for _ in range(self.parse_workers)
+        ]
+        for process in self._parse_processes:
+            process.start()
+
+    def _enqueue(self, cur: psycopg2.extras.ReplicationCursor, item: Any) -> None:
+        """Queue item for the consumers, waiting while the queue is full.
+
+        Keeps confirming progress and sending status updates while it waits so
+        the server doesn't drop the connection. Gives up once stop() is called;
+        the item's LSN is then never confirmed and the server sends it again.
+        """
+        last_status_ts = time.monotonic()
+        while True:
+            try:
+                self._queue.put(item, timeout=_QUEUE_PUT_TIMEOUT)
+                self._queued_lsn = item[1]
+                return
+            except queue.Full:
+                pass
+            if self._stop.is_set():
+                return
+            self._flush_feedback(cur)
+            now = time.monotonic()
+            if now - last_status_ts >= _STATUS_INTERVAL:
+                # No new position to report, this only keeps the connection alive
+                cur.send_feedback(force=True)
+                last_status_ts = now
+
+    def _stop_consumers(self) -> None:
+        """Let the consumers drain what is already queued, then wait for them to exit."""
+        for _ in range(len(self._parse_processes) or 1):
+            # After a failure nothing drains the queue any more
+            while self._failure is None:
+                try:
+                    self._queue.put(None, timeout=_QUEUE_PUT_TIMEOUT)
+                    break
+                except queue.Full:
+                    pass
+        if self._consumer_thread and self._consumer_thread is not threading.current_thread():
+            self._consumer_thread.join()
+        if self._failure is not None and self._parse_processes:
+            # Don't wait on exit for queued items no process will read
+            self._queue.cancel_join_thread()
+            for process in self._parse_processes:
+                process.terminate()
+        for process in self._parse_processes:
+            process.join()
+        self._parse_processes = []
+
+    def _fail(self, error: Exception) -> None:
+        """End the stream because of error, raised by the replication thread."""
+        self._failure = error
+        self._signal_stop()
+
+    def _start_replication(self) -> psycopg2.extras.ReplicationCursor:
+        """Open the replication connection and start streaming from the slot."""
+        self._replication_conn = psycopg2.connect(
+            self.dsn,
+            connection_factory=psycopg2.extras.LogicalReplicationConnection
+        )
+        cur = self._replication_conn.cursor()
+        logger.info("Starting replication with options: %s", self._normalized_plugin_options)
+        cur.start_replication(
+            slot_name=self.slot_name,
+            options=self._normalized_plugin_options,
+            # Keep payloads as bytes, the JSON decoders parse them directly
+            decode=False,
+            status_interval=_STATUS_INTERVAL,
+            start_lsn=self._start_lsn
+        )
+        return cur
+
+    def _replication_worker(self) -> None:
+        """Worker thread reading replication messages from the server."""
+        consumers_stopped = False
+        try:
+            cur = self._start_replication()
+            # Both are open until this worker closes them on its way out
+            conn, wakeup_r = self._replication_conn, self._wakeup_r
+            assert conn is not None and wakeup_r is not None
+            with cur, selectors.DefaultSelector() as sel:
+                sel.register(conn, selectors.EVENT_READ)
+                sel.register(wakeup_r, selectors.EVENT_READ)
                 
-                while self._running:
-                    msg = cur.read_message()
-                    if msg is None:
-                        print("No message received, sleeping...")
-                        time.sleep(0.1)
-                        continue
-                    
-                    try:
+                # Position of each queued payload, lets parse processes restore stream order
+                seq = 0
+
+                try:
+                    while not self._stop.is_set():
+                        msg = cur.read_message()
+                        if msg is None:
+                            sel.select(timeout=self._idle(cur))
+                            continue
+
                         if msg.payload:
-                            data = msg.payload
-                            print(f"Received raw data: {data}")
-                            
-                            try:
-                                parsed_data = json.loads(data)
-                                print(f"Parsed data: {parsed_data}")
-                                wal_output = Wal2JsonOutput.from_dict(parsed_data)
-                                if callback:
-                                    callback(msg.data_start, wal_output)
-                            except json.JSONDecodeError as e:
-                                print(f"Error decoding JSON: {e}")
-                                continue
-                            
-                            # Send feedback
-                            print(f"Sending feedback with LSN: {msg.data_start}")
-                            cur.send_feedback(
-                                write_lsn=msg.data_start,
-                                flush_lsn=msg.data_start,
-                                apply_lsn=msg.data_start,
-                                force=True
-                            )
+                            logger.debug("Received raw data: %s", msg.payload)
+                            # Decoding and the callback run on the consumer thread
+                            self._enqueue(cur, (seq, msg.data_start, msg.payload))
+                            seq += 1
                         else:
-                            print(f"Message received but no payload: {msg}")
-                        
-                    except Exception as e:
-                        print(f"Error processing message: {e}")
-                        if not self._running:
-                            break
-                        time.sleep(0.1)
-                        
+                            logger.debug("Message received but no payload: %s", msg)
+                        self._message_read(cur)
+                finally:
+                    self._stop_consumers()
+                    consumers_stopped = True
+
+                self._flush_feedback(cur)
+                if self._failure is not None:
+                    raise self._failure
+
         except Exception as e:
-            print(f"Error in replication: {e}")
+            logger.exception("Error in replication: %s", e)
             raise
         finally:
-            if self._replication_conn:
-                self._replication_conn.close()
-                self._replication_conn = None
+            # Make sure the consumers exit even if the stream never started
+            if not consumers_stopped:
+                self._stop_consumers()
+            self._close_wakeup()
+            self._close_replication_conn()
+
+    def _close_replication_conn(self) -> None:
+        if self._replication_conn:
+            self._replication_conn.close()
+            self._replication_conn = None
+
+    def _signal_stop(self) -> None:
+        """Ask the workers to stop and wake the one waiting for data."""
+        self._stop.set()
+        wakeup_w = self._wakeup_w
+        if wakeup_w:
+            try:
+                wakeup_w.send(b"\0")
+            except OSError:
+                # Worker already closed it on its way out
+                pass
+
+    def _open_wakeup(self) -> None:
+        """Create the socket pair stop() writes to in order to wake the worker."""
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+
+    def _close_wakeup(self) -> None:
+        if self._wakeup_r:
+            self._wakeup_r.close()
+            self._wakeup_r = None
+        if self._wakeup_w:
+            self._wakeup_w.close()
+            self._wakeup_w = None
+
+    def _send_feedback(self, cur: psycopg2.extras.ReplicationCursor, lsn: int) -> None:
+        """Report everything up to lsn as written, flushed and applied."""
+        logger.debug("Sending feedback with LSN: %s", lsn)
+        cur.send_feedback(
+            write_lsn=lsn,
+            flush_lsn=lsn,
+            apply_lsn=lsn,
+            force=True
+        )
+
+    def _reset_feedback(self) -> None:
+        """Start the feedback bookkeeping of a new stream."""
+        self._last_committed_lsn = 0
+        # Highest LSN already reported to the server
+        self._sent_lsn = 0
+        # LSN of the last payload queued for the consumer thread
+        self._queued_lsn = 0
+        self._msg_count = 0
+        self._last_feedback_ts = time.monotonic()
+
+    def _flush_feedback(self, cur: psycopg2.extras.ReplicationCursor) -> None:
+        """Confirm the last committed LSN if it moved past the one already sent."""
+        self._last_feedback_ts = time.monotonic()
+        lsn = self._last_committed_lsn
+        if lsn <= self._sent_lsn:
+            return
+        self._send_feedback(cur, lsn)
+        self._sent_lsn = lsn
 
-    def start(self, callback: Callable[[str, Wal2JsonOutput], None]) -> None:
-        """Start the replication stream."""
+    def _message_read(self, cur: psycopg2.extras.ReplicationCursor) -> None:
+        """Count a message read from the stream, confirming progress once a batch is due."""
+        self._msg_count += 1
+        if (
+            self._msg_count % self.feedback_batch_size == 0
+            or time.monotonic() - self._last_feedback_ts >= self.feedback_interval
+        ):
+            self._flush_feedback(cur)
+
+    def _idle(self, cur: psycopg2.extras.ReplicationCursor) -> float:
+        """Confirm what has been processed so far, return how long to wait for data."""
+        self._flush_feedback(cur)
+        logger.debug("No message received, waiting for data...")
+        if self._sent_lsn < self._queued_lsn:
+            # The consumer thread is still on the last messages, come back to
+            # confirm them after feedback_interval
+            return min(_STATUS_INTERVAL, self.feedback_interval)
+        return _STATUS_INTERVAL
+
+    def start(self, callback: Callable[[str, Any], None], raw: bool = False) -> None:
+        """Start the replication stream.
+
+        The callback receives the LSN of each message and its decoded
+        Wal2JsonOutput. With raw=True it receives the payload bytes exactly as
+        sent by the output plugin instead, skipping JSON decoding entirely.
+
+        With parse_workers set, JSON decoding runs in that many separate
+        processes; the callback still runs in this process, in stream order.
+        If one of them dies, the stream ends with an error.
+        """
         self._callback = callback
-        self._running = True
-        
-        # Start replication in a separate thread
-        self._thread = threading.Thread(
-            target=self._replication_worker,
+        self._raw = raw
+        self._stop.clear()
+        self._open_wakeup()
+        self._reset_feedback()
+        self._failure = None
+
+        if self.parse_workers > 0 and not raw:
+            self._start_parse_processes()
+            consumer = self._result_worker
+        else:
+            self._queue = queue.Queue(maxsize=self.max_queued_messages)
+            consumer = self._consumer_worker
+
+        # Decode messages and run the callback off the socket-reading thread
+        self._consumer_thread = threading.Thread(
+            target=consumer,
             args=(callback,)
         )
+        self._consumer_thread.daemon = True
+        self._consumer_thread.start()
+        
+        # Start replication in a separate thread
+        self._thread = threading.Thread(target=self._replication_worker)
         self._thread.daemon = True
         self._thread.start()
 
+    async def start_async(self, callback: Callable[[str, Any], Any], raw: bool = False) -> None:
+        """Run the replication stream on the running event loop until stop() is called.
+
+        Coroutine callbacks are awaited; plain callbacks run through
+        asyncio.to_thread so they never block the loop. The raw flag works as
+        in start(); parse_workers is not used here.
+        """
+        self._callback = callback
+        self._raw = raw
+        self._stop.clear()
+        self._open_wakeup()
+        self._reset_feedback()
+        is_coroutine = inspect.iscoroutinefunction(callback)
+        loop = asyncio.get_running_loop()
+
+        # Connecting and starting the stream block, keep them off the loop.
+        # Shielded so a cancelled task can still tell when the thread is done
+        starting = asyncio.ensure_future(asyncio.to_thread(self._start_replication))
+        try:
+            cur = await asyncio.shield(starting)
+        except BaseException:
+            self._close_wakeup()
+            if starting.done():
+                self._close_replication_conn()
+            else:
+                # Cancelled while connecting, close the connection once the
+                # thread has finished opening it
+                starting.add_done_callback(lambda _: self._close_replication_conn())
+            raise
+        conn, wakeup_r = self._replication_conn, self._wakeup_r
+        assert conn is not None and wakeup_r is not None
+        fileno = conn.fileno()
+        wakeup_fileno = wakeup_r.fileno()
+        readable = asyncio.Event()
+        loop.add_reader(fileno, readable.set)
+        loop.add_reader(wakeup_fileno, readable.set)
+        try:
+            while not self._stop.is_set():
+                msg = cur.read_message()
+                if msg is None:
+                    timeout = self._idle(cur)
+                    readable.clear()
+                    try:
+                        await asyncio.wait_for(readable.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                if msg.payload:
+                    logger.debug("Received raw data: %s", msg.payload)
+                    try:
+                        payload = self._decode_payload(msg.payload)
+                        if payload is not None:
+                            if is_coroutine:
+                                await callback(msg.data_start, payload)
+                            else:
+                                await asyncio.to_thread(callback, msg.data_start, payload)
+                            self._last_committed_lsn = msg.data_start
+                    except Exception as e:
+                        logger.exception("Error processing message: %s", e)
+                else:
+                    logger.debug("Message received but no payload: %s", msg)
+                self._message_read(cur)
+
+            self._flush_feedback(cur)
+
+        except Exception as e:
+            logger.exception("Error in replication: %s", e)
+            raise
+        finally:
+            loop.remove_reader(fileno)
+            loop.remove_reader(wakeup_fileno)
+            self._close_wakeup()
+            self._close_replication_conn()
+
     def stop(self) -> None:
-        """Stop the replication stream."""
-        self._running = False
+        """Stop the replication stream.
+
+        For a stream started with start(), waits until every message already
+        read has been passed to the callback and its LSN confirmed. When called
+        from the callback itself, only signals the workers to stop.
+
+        For start_async() it only signals the stream to stop; await the task
+        to wait for it to finish.
+        """
+        self._signal_stop()
+        if threading.current_thread() in (self._thread, self._consumer_thread):
+            return
         if self._thread:
-            self._thread.join(timeout=5)
+            self._thread.join()
             self._thread = None
+        self._consumer_thread = None
@@ -1,7 +1,51 @@
+import sys
+from collections.abc import Mapping
 from dataclasses import dataclass
-from typing import Any, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-@dataclass
+# wal2json format-version 2 action codes for row changes; transaction
+# boundaries ("B", "C") and logical messages ("M") carry no row data
+_V2_ACTIONS: Dict[str, str] = {
+    "I": "insert",
+    "U": "update",
+    "D": "delete",
+    "T": "truncate",
+}
+
+# Stand-in for a missing format-version 1 "oldkeys" object, never handed out
+_EMPTY_OLDKEYS: Dict[str, List[Any]] = {}
+
+# Column name -> position, shared by every row with the same column list
+_COLUMN_INDEX: Dict[Tuple[str, ...], Dict[str, int]] = {}
+
+class Wal2JsonRecord(Mapping):
+    """Read-only mapping of column names to values backed by a change's lists."""
+
+    __slots__ = ("_index", "_values")
+
+    def __init__(self, columnnames: List[str], columnvalues: List[Any]):
+        # Keyed by the column list itself so a table whose columns change
+        # gets a fresh index
+        key = tuple(columnnames)
+        index = _COLUMN_INDEX.get(key)
+        if index is None:
+            index = _COLUMN_INDEX.setdefault(key, {name: i for i, name in enumerate(key)})
+        self._index = index
+        self._values = columnvalues
+
+    def __getitem__(self, key: str) -> Any:
+        return self._values[self._index[key]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __repr__(self) -> str:
+        return f"Wal2JsonRecord({dict(self)!r})"
+
+@dataclass(slots=True)
 class Wal2JsonChange:
     kind: str  # 'insert', 'update', 'delete'
     schema: str
@@ -11,22 +55,118 @@ class Wal2JsonChange:
     columnvalues: List[Any]
     oldkeys: Optional[dict] = None
 
-@dataclass
+    @classmethod
+    def from_v2_dict(cls, data: dict) -> "Wal2JsonChange":
+        columns = data.get("columns")
+        identity = data.get("identity")
+        # Expose the identity in the same shape as format-version 1 oldkeys
+        oldkeys = None
+        if identity is not None:
+            oldkeys = {
+                "keynames": [column["name"] for column in identity],
+                "keytypes": [column.get("type") for column in identity],
+                "keyvalues": [column.get("value") for column in identity],
+            }
+        if columns is None:
+            columns = identity or []
+        return cls(
+            kind=_V2_ACTIONS[data["action"]],
+            schema=sys.intern(data["schema"]),
+            table=sys.intern(data["table"]),
+            columnnames=[column["name"] for column in columns],
+            columntypes=[column.get("type") for column in columns],
+            columnvalues=[column.get("value") for column in columns],
+            oldkeys=oldkeys
+        )
+
+    def as_record(self) -> Wal2JsonRecord:
+        return Wal2JsonRecord(self.columnnames, self.columnvalues)
+
+def _build_changes(raw_changes: List[dict]) -> List[Wal2JsonChange]:
+    """Build the changes of a format-version 1 message."""
+    # Allocate the list once instead of growing it for large transactions
+    changes: List[Any] = [None] * len(raw_changes)
+    for i, change in enumerate(raw_changes):
+        kind = change["kind"]
+        oldkeys = change.get("oldkeys")
+        if kind == "insert" or kind == "update":
+            # Inserts and updates always carry the full new row; the types are
+            # left out when include-types is false
+            columnnames = change["columnnames"]
+            columntypes = change.get("columntypes", [])
+            columnvalues = change["columnvalues"]
+        else:
+            # Deletes only describe the old row through its key columns
+            keys = oldkeys or _EMPTY_OLDKEYS
+            columnnames = change.get("columnnames", keys.get("keynames", []))
+            columntypes = change.get("columntypes", keys.get("keytypes", []))
+            columnvalues = change.get("columnvalues", keys.get("keyvalues", []))
+        changes[i] = Wal2JsonChange(
+            # These repeat across rows, share one string object per value
+            kind=sys.intern(kind),
+            schema=sys.intern(change["schema"]),
+            table=sys.intern(change["table"]),
+            columnnames=columnnames,
+            columntypes=columntypes,
+            columnvalues=columnvalues,
+            oldkeys=oldkeys
+        )
+    return changes
+
+# Prefer the compiled version of _build_changes when the optional Cython
+# extension has been built (see README); it needs Wal2JsonChange defined above
+try:
+    from ._wal2json_fast import (  # type: ignore[no-redef, import-not-found]
+        build_changes as _build_changes,
+    )
+except ImportError:
+    pass
+
+def _changes_from_dict(data: dict) -> List[Wal2JsonChange]:
+    if "action" in data:
+        # format-version 2 emits one message per change
+        if data["action"] in _V2_ACTIONS:
+            return [Wal2JsonChange.from_v2_dict(data)]
+        return []
+    return _build_changes(data["change"])
+
 class Wal2JsonOutput:
-    change: List[Wal2JsonChange]
+    """A decoded wal2json message.
+
+    from_dict() only keeps the parsed JSON; the Wal2JsonChange objects are
+    built the first time change is accessed, so callbacks that skip a message
+    never pay for them.
+    """
+
+    __slots__ = ("_data", "_change")
+
+    def __init__(self, change: Optional[List[Wal2JsonChange]] = None, *, data: Optional[dict] = None):
+        self._data = data
+        self._change = change
+
+    @property
+    def change(self) -> List[Wal2JsonChange]:
+        if self._change is None:
+            self._change = _changes_from_dict(self._data) if self._data is not None else []
+            # The parsed JSON is no longer needed once the changes exist
+            self._data = None
+        return self._change
+
+    @change.setter
+    def change(self, value: List[Wal2JsonChange]) -> None:
+        self._change = value
+        self._data = None
+
+    def __repr__(self) -> str:
+        return f"Wal2JsonOutput(change={self.change!r})"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Wal2JsonOutput):
+            return NotImplemented
+        return self.change == other.change
+
+    __hash__ = None  # type: ignore[assignment]
 
     @classmethod
     def from_dict(cls, data: dict) -> "Wal2JsonOutput":
-        changes = [
-            Wal2JsonChange(
-                kind=change["kind"],
-                schema=change["schema"],
-                table=change["table"],
-                columnnames=change.get("columnnames", change.get("oldkeys", {}).get("keynames", [])),
-                columntypes=change.get("columntypes", change.get("oldkeys", {}).get("keytypes", [])),
-                columnvalues=change.get("columnvalues", change.get("oldkeys", {}).get("keyvalues", [])),
-                oldkeys=change.get("oldkeys")
-            )
-            for change in data["change"]
-        ]
-        return cls(change=changes)
+        return cls(data=data)
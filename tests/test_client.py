@@ -0,0 +1,517 @@
+import asyncio
+import collections
+import json
+import socket
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+from pg_logical_replication import client as client_module
+from pg_logical_replication.client import LogicalReplicationClient, _lsn_to_int
+
+BIG_INT = 123456789012345678901234567890
+BIG_INT_PAYLOAD = (
+    b'{"action": "I", "schema": "public", "table": "amounts", '
+    b'"columns": [{"name": "amount", "type": "numeric", "value": 123456789012345678901234567890}]}'
+)
+
+
+def make_client(**kwargs):
+    return LogicalReplicationClient(dsn="postgresql://localhost/test", slot_name="test", **kwargs)
+
+
+def make_message(lsn):
+    payload = {
+        "action": "I",
+        "schema": "public",
+        "table": "users",
+        "columns": [{"name": "id", "type": "bigint", "value": lsn}],
+    }
+    return FakeMessage(lsn, json.dumps(payload).encode())
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+
+class FakeMessage:
+    def __init__(self, data_start, payload):
+        self.data_start = data_start
+        self.payload = payload
+
+
+class FakeCursor:
+    """Stands in for psycopg2's ReplicationCursor."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def start_replication(self, **kwargs):
+        self.conn.start_gate.wait()
+        if self.conn.start_error:
+            raise self.conn.start_error
+        self.conn.replication_kwargs = kwargs
+
+    def read_message(self):
+        with self.conn.lock:
+            if self.conn.messages:
+                self.conn.read_count += 1
+                return self.conn.messages.popleft()
+            # Nothing left to read, stay quiet until the next push()
+            try:
+                while self.conn.sock.recv(4096):
+                    pass
+            except BlockingIOError:
+                pass
+            return None
+
+    def send_feedback(self, write_lsn=0, flush_lsn=0, apply_lsn=0, reply=False, force=False):
+        if flush_lsn:
+            self.conn.feedback.append(flush_lsn)
+        else:
+            self.conn.keepalives += 1
+
+
+class FakeConnection:
+    """Replication connection fed through push() instead of a server."""
+
+    def __init__(self):
+        self.messages = collections.deque()
+        self.feedback = []
+        self.keepalives = 0
+        self.read_count = 0
+        self.closed = False
+        self.replication_kwargs = None
+        # start_replication() waits for the gate, then raises start_error if set
+        self.start_gate = threading.Event()
+        self.start_gate.set()
+        self.start_error = None
+        self.lock = threading.Lock()
+        self.sock, self._peer = socket.socketpair()
+        self.sock.setblocking(False)
+
+    def push(self, *messages):
+        with self.lock:
+            self.messages.extend(messages)
+        self._peer.send(b"\0")
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    conn = FakeConnection()
+    monkeypatch.setattr(client_module.psycopg2, "connect", lambda *args, **kwargs: conn)
+    yield conn
+    conn.sock.close()
+    conn._peer.close()
+
+
+def test_lsn_to_int():
+    assert _lsn_to_int("0/0") == 0
+    assert _lsn_to_int("0/199EB170") == 0x199EB170
+    assert _lsn_to_int("16/B374D848") == (0x16 << 32) | 0xB374D848
+    # The low half is not zero-padded
+    assert _lsn_to_int("1/A") == (1 << 32) | 0xA
+
+
+def test_plugin_options_are_normalized():
+    client = LogicalReplicationClient(
+        dsn="postgresql://localhost/test",
+        slot_name="test",
+        plugin_options={"include_timestamp": True, "add-tables": "public.users"},
+    )
+    assert client._normalized_plugin_options == {
+        "include-timestamp": "True",
+        "add-tables": "public.users",
+        "format-version": "2",
+    }
+
+    client = LogicalReplicationClient(
+        dsn="postgresql://localhost/test",
+        slot_name="test",
+        plugin_options={"format_version": 1},
+    )
+    assert client._normalized_plugin_options == {"format-version": "1"}
+
+
+def test_plugin_options_of_other_plugins_are_unchanged():
+    client = make_client(
+        plugin="pgoutput",
+        plugin_options={"proto_version": 1, "publication_names": "users_pub"},
+    )
+    assert client._normalized_plugin_options == {
+        "proto_version": "1",
+        "publication_names": "users_pub",
+    }
+
+
+def test_json_decoder_keeps_big_integers_by_default():
+    client = make_client()
+    assert client.json_decoder == "json"
+
+    value = client._decode_payload(BIG_INT_PAYLOAD).change[0].columnvalues[0]
+    assert value == BIG_INT
+    assert isinstance(value, int)
+
+
+def test_json_decoder_opt_in():
+    pytest.importorskip("orjson")
+    client = make_client(json_decoder="orjson")
+    # Loses precision past 64 bits, which is why it isn't the default
+    value = client._decode_payload(BIG_INT_PAYLOAD).change[0].columnvalues[0]
+    assert value == float(BIG_INT)
+
+    with pytest.raises(ValueError):
+        make_client(json_decoder="ujson")
+
+
+def test_simdjson_falls_back_on_big_integers(monkeypatch):
+    def loads(data):
+        if str(BIG_INT).encode() in data:
+            raise RuntimeError("BIGINT_ERROR: Big integer value")
+        return json.loads(data)
+
+    # Behaves like pysimdjson, which may not be installed
+    monkeypatch.setitem(sys.modules, "simdjson", types.SimpleNamespace(loads=loads))
+    client = make_client(json_decoder="simdjson")
+
+    assert client._decode_payload(BIG_INT_PAYLOAD).change[0].columnvalues[0] == BIG_INT
+    assert client._decode_payload(b"{") is None
+
+
+def test_feedback_arguments_are_validated():
+    with pytest.raises(ValueError):
+        make_client(feedback_batch_size=0)
+    with pytest.raises(ValueError):
+        make_client(feedback_interval=0)
+    with pytest.raises(ValueError):
+        make_client(max_queued_messages=0)
+
+
+def test_feedback_is_batched(conn):
+    conn.push(*[make_message(lsn) for lsn in range(1, 251)])
+    received = []
+    client = make_client(feedback_interval=3600)
+    client.start(lambda lsn, output: received.append(lsn))
+    wait_for(lambda: len(received) == 250)
+    client.stop()
+
+    assert received == list(range(1, 251))
+    # A handful of confirmations rather than one per message
+    assert len(conn.feedback) <= 4
+    assert conn.feedback == sorted(set(conn.feedback))
+    assert conn.feedback[-1] == 250
+
+
+def test_feedback_is_flushed_when_idle(conn):
+    def callback(lsn, output):
+        time.sleep(0.05)
+
+    client = make_client(feedback_interval=0.2)
+    client.start(callback)
+    try:
+        wait_for(lambda: conn.replication_kwargs is not None)
+        pushed = time.monotonic()
+        conn.push(*[make_message(lsn) for lsn in range(1, 4)])
+        wait_for(lambda: conn.feedback[-1:] == [3])
+        # Well before the next status update, 10 seconds away
+        assert time.monotonic() - pushed < 1
+    finally:
+        client.stop()
+    assert conn.feedback == sorted(set(conn.feedback))
+
+
+def test_feedback_is_flushed_on_stop(conn):
+    received = []
+
+    def callback(lsn, output):
+        time.sleep(0.05)
+        received.append(lsn)
+
+    conn.push(*[make_message(lsn) for lsn in range(1, 6)])
+    client = make_client(feedback_interval=3600)
+    client.start(callback)
+    wait_for(lambda: conn.read_count == 5)
+    client.stop()
+
+    assert received == [1, 2, 3, 4, 5]
+    assert conn.feedback[-1] == 5
+    assert conn.closed
+
+
+def test_queue_is_bounded(conn, monkeypatch):
+    monkeypatch.setattr(client_module, "_QUEUE_PUT_TIMEOUT", 0.01)
+    monkeypatch.setattr(client_module, "_STATUS_INTERVAL", 0.05)
+    release = threading.Event()
+    received = []
+
+    def callback(lsn, output):
+        release.wait()
+        received.append(lsn)
+
+    conn.push(*[make_message(lsn) for lsn in range(1, 21)])
+    client = make_client(max_queued_messages=2)
+    client.start(callback)
+    try:
+        # Status updates keep going while the socket thread waits
+        wait_for(lambda: conn.keepalives >= 2)
+        # One message in the callback, two queued and one waiting to be
+        assert conn.read_count <= 4
+        release.set()
+        wait_for(lambda: len(received) == 20)
+    finally:
+        release.set()
+        client.stop()
+    assert received == list(range(1, 21))
+    assert conn.feedback[-1] == 20
+
+
+def test_stop_while_queue_is_full(conn, monkeypatch):
+    monkeypatch.setattr(client_module, "_QUEUE_PUT_TIMEOUT", 0.01)
+    release = threading.Event()
+    received = []
+
+    def callback(lsn, output):
+        release.wait()
+        received.append(lsn)
+
+    conn.push(*[make_message(lsn) for lsn in range(1, 21)])
+    client = make_client(max_queued_messages=2)
+    client.start(callback)
+    wait_for(lambda: conn.read_count >= 4)
+
+    stopper = threading.Thread(target=client.stop)
+    stopper.start()
+    time.sleep(0.1)
+    release.set()
+    stopper.join(5)
+
+    assert not stopper.is_alive()
+    # Queued messages are still handled, the one that didn't fit is not confirmed
+    assert received == list(range(1, 4))
+    assert conn.feedback[-1] == 3
+
+
+def test_raw_payloads_are_passed_through(conn):
+    payloads = [b'{"action": "B"}', b"not json at all", make_message(3).payload]
+    conn.push(*[FakeMessage(lsn, payload) for lsn, payload in enumerate(payloads, 1)])
+    received = []
+    client = make_client()
+    client.start(lambda lsn, payload: received.append((lsn, payload)), raw=True)
+    wait_for(lambda: len(received) == 3)
+    client.stop()
+
+    # The very same bytes objects, not even decoded as JSON
+    assert [lsn for lsn, _ in received] == [1, 2, 3]
+    assert all(got is sent for (_, got), sent in zip(received, payloads))
+    assert conn.replication_kwargs["decode"] is False
+    assert conn.feedback[-1] == 3
+
+
+def test_start_async_stop(conn):
+    received = []
+
+    async def callback(lsn, output):
+        received.append(lsn)
+
+    async def main():
+        client = make_client()
+        task = asyncio.create_task(client.start_async(callback))
+        conn.push(*[make_message(lsn) for lsn in range(1, 4)])
+        while len(received) < 3:
+            await asyncio.sleep(0.01)
+        client.stop()
+        await asyncio.wait_for(task, 5)
+        return client
+
+    client = asyncio.run(main())
+    assert received == [1, 2, 3]
+    assert conn.feedback[-1] == 3
+    assert conn.closed
+    assert client._replication_conn is None
+    assert client._wakeup_r is None
+
+
+def test_start_async_cancel(conn):
+    async def main():
+        client = make_client()
+        task = asyncio.create_task(client.start_async(lambda lsn, output: None))
+        while conn.replication_kwargs is None:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return client
+
+    client = asyncio.run(main())
+    assert conn.closed
+    assert client._replication_conn is None
+    assert client._wakeup_r is None
+
+
+def test_start_async_start_failure(conn):
+    conn.start_error = RuntimeError("replication slot is active")
+    client = make_client()
+    with pytest.raises(RuntimeError):
+        asyncio.run(client.start_async(lambda lsn, output: None))
+    assert conn.closed
+    assert client._replication_conn is None
+
+
+def test_start_async_cancel_while_connecting(conn):
+    conn.start_gate.clear()
+
+    async def main():
+        client = make_client()
+        task = asyncio.create_task(client.start_async(lambda lsn, output: None))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The connection is still being opened in the worker thread
+        conn.start_gate.set()
+        for _ in range(500):
+            if conn.closed:
+                break
+            await asyncio.sleep(0.01)
+        return client
+
+    client = asyncio.run(main())
+    assert conn.closed
+    assert client._replication_conn is None
+
+
+def test_lsn_is_confirmed_after_the_callback(conn, monkeypatch):
+    monkeypatch.setattr(client_module, "_STATUS_INTERVAL", 0.02)
+    entered = threading.Event()
+    release = threading.Event()
+
+    def callback(lsn, output):
+        if lsn == 2:
+            entered.set()
+            release.wait()
+
+    conn.push(*[make_message(lsn) for lsn in range(1, 4)])
+    client = make_client(feedback_batch_size=1)
+    client.start(callback)
+    try:
+        assert entered.wait(5)
+        # Plenty of idle flushes happen while the callback is busy
+        time.sleep(0.2)
+        assert conn.feedback == [1]
+        release.set()
+        wait_for(lambda: conn.feedback[-1:] == [3])
+    finally:
+        release.set()
+        client.stop()
+
+
+def test_stop_wakes_an_idle_worker(conn):
+    client = make_client()
+    client.start(lambda lsn, output: None)
+    wait_for(lambda: conn.replication_kwargs is not None)
+    time.sleep(0.05)
+
+    started = time.monotonic()
+    client.stop()
+    # Well under the status interval the worker would otherwise sleep for
+    assert time.monotonic() - started < 1
+    assert client._thread is None
+    assert conn.closed
+
+
+def test_stop_from_the_callback(conn):
+    received = []
+
+    def callback(lsn, output):
+        received.append(lsn)
+        if lsn == 2:
+            client.stop()
+
+    client = make_client()
+    client.start(callback)
+    thread = client._thread
+    conn.push(*[make_message(lsn) for lsn in range(1, 4)])
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert received[:2] == [1, 2]
+    assert conn.feedback[-1] == received[-1]
+    assert conn.closed
+    client.stop()
+
+
+def test_parse_workers_keep_stream_order(conn):
+    messages = [make_message(lsn) for lsn in range(1, 201)]
+    # Decoding errors are skipped without stalling the messages behind them
+    messages[49] = FakeMessage(50, b"{")
+    conn.push(*messages)
+    received = []
+    client = make_client(parse_workers=2)
+    client.start(lambda lsn, output: received.append((lsn, output.change[0].columnvalues[0])))
+    processes = list(client._parse_processes)
+    wait_for(lambda: len(received) == 199, timeout=30)
+    client.stop()
+
+    expected = [lsn for lsn in range(1, 201) if lsn != 50]
+    assert received == [(lsn, lsn) for lsn in expected]
+    assert conn.feedback[-1] == 200
+    assert client._parse_processes == []
+    assert all(process.exitcode == 0 for process in processes)
+
+
+def test_parse_workers_stop_while_idle(conn):
+    client = make_client(parse_workers=2)
+    client.start(lambda lsn, output: None)
+    processes = list(client._parse_processes)
+    wait_for(lambda: conn.replication_kwargs is not None)
+
+    client.stop()
+    assert client._thread is None
+    assert conn.closed
+    assert not any(process.is_alive() for process in processes)
+
+
+# The replication thread ends by raising the failure
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_dead_parse_worker_ends_the_stream(conn, monkeypatch):
+    monkeypatch.setattr(client_module, "_PROCESS_CHECK_INTERVAL", 0.05)
+    received = []
+    client = make_client(parse_workers=2, max_queued_messages=4)
+    client.start(lambda lsn, output: received.append(lsn))
+    processes = list(client._parse_processes)
+    thread = client._thread
+    conn.push(make_message(1))
+    wait_for(lambda: received == [1], timeout=30)
+
+    processes[0].kill()
+    conn.push(*[make_message(lsn) for lsn in range(2, 51)])
+    thread.join(10)
+
+    assert not thread.is_alive()
+    assert isinstance(client._failure, RuntimeError)
+    assert not any(process.is_alive() for process in processes)
+    # Nothing past the lost messages is confirmed
+    assert conn.feedback[-1] == received[-1]
+    assert received == list(range(1, len(received) + 1))
+    client.stop()
@@ -0,0 +1,170 @@
+from pg_logical_replication.models import Wal2JsonOutput
+
+
+def test_from_dict_format_v1():
+    output = Wal2JsonOutput.from_dict({
+        "change": [
+            {
+                "kind": "insert",
+                "schema": "public",
+                "table": "users",
+                "columnnames": ["id", "firstname"],
+                "columntypes": ["bigint", "text"],
+                "columnvalues": [1, "alice"],
+            },
+            {
+                "kind": "delete",
+                "schema": "public",
+                "table": "users",
+                "oldkeys": {
+                    "keynames": ["id"],
+                    "keytypes": ["bigint"],
+                    "keyvalues": [1],
+                },
+            },
+        ]
+    })
+
+    insert, delete = output.change
+    assert insert.kind == "insert"
+    assert insert.columnnames == ["id", "firstname"]
+    assert insert.columnvalues == [1, "alice"]
+    assert insert.oldkeys is None
+
+    assert delete.kind == "delete"
+    assert delete.columnnames == ["id"]
+    assert delete.columntypes == ["bigint"]
+    assert delete.columnvalues == [1]
+
+
+def test_from_dict_format_v1_without_types():
+    # format-version 1 with include-types=false
+    insert = Wal2JsonOutput.from_dict({
+        "change": [
+            {
+                "kind": "insert",
+                "schema": "public",
+                "table": "users",
+                "columnnames": ["id", "firstname"],
+                "columnvalues": [1, "alice"],
+            },
+        ]
+    }).change[0]
+    assert insert.columnnames == ["id", "firstname"]
+    assert insert.columntypes == []
+    assert insert.columnvalues == [1, "alice"]
+
+
+def test_changes_without_types_do_not_share_columntypes():
+    first, second = Wal2JsonOutput.from_dict({
+        "change": [
+            {
+                "kind": "insert",
+                "schema": "public",
+                "table": "users",
+                "columnnames": ["id"],
+                "columnvalues": [id_],
+            }
+            for id_ in (1, 2)
+        ]
+    }).change
+    assert first.columntypes is not second.columntypes
+
+    first.columntypes.append("bigint")
+    assert second.columntypes == []
+
+
+def test_from_dict_format_v2():
+    insert = Wal2JsonOutput.from_dict({
+        "action": "I",
+        "schema": "public",
+        "table": "users",
+        "columns": [
+            {"name": "id", "type": "bigint", "value": 1},
+            {"name": "firstname", "type": "text", "value": "alice"},
+        ],
+    }).change[0]
+    assert insert.kind == "insert"
+    assert insert.schema == "public"
+    assert insert.table == "users"
+    assert insert.columnnames == ["id", "firstname"]
+    assert insert.columntypes == ["bigint", "text"]
+    assert insert.columnvalues == [1, "alice"]
+    assert insert.oldkeys is None
+
+    update = Wal2JsonOutput.from_dict({
+        "action": "U",
+        "schema": "public",
+        "table": "users",
+        "columns": [
+            {"name": "id", "type": "bigint", "value": 1},
+            {"name": "firstname", "type": "text", "value": "bob"},
+        ],
+        "identity": [
+            {"name": "id", "type": "bigint", "value": 1},
+            {"name": "firstname", "type": "text", "value": "alice"},
+        ],
+    }).change[0]
+    assert update.kind == "update"
+    assert update.columnvalues == [1, "bob"]
+    assert update.oldkeys == {
+        "keynames": ["id", "firstname"],
+        "keytypes": ["bigint", "text"],
+        "keyvalues": [1, "alice"],
+    }
+
+    delete = Wal2JsonOutput.from_dict({
+        "action": "D",
+        "schema": "public",
+        "table": "users",
+        "identity": [{"name": "id", "type": "bigint", "value": 1}],
+    }).change[0]
+    assert delete.kind == "delete"
+    assert delete.columnnames == ["id"]
+    assert delete.columnvalues == [1]
+
+
+def test_from_dict_format_v2_transaction_boundaries():
+    assert Wal2JsonOutput.from_dict({"action": "B"}).change == []
+    assert Wal2JsonOutput.from_dict({"action": "C"}).change == []
+
+
+def test_as_record():
+    first, second = Wal2JsonOutput.from_dict({
+        "change": [
+            {
+                "kind": "insert",
+                "schema": "public",
+                "table": "users",
+                "columnnames": ["id", "firstname"],
+                "columntypes": ["bigint", "text"],
+                "columnvalues": [id_, name],
+            }
+            for id_, name in [(1, "alice"), (2, "bob")]
+        ]
+    }).change
+
+    record = first.as_record()
+    assert record["firstname"] == "alice"
+    assert list(record) == ["id", "firstname"]
+    assert len(record) == 2
+    assert record == {"id": 1, "firstname": "alice"}
+    assert record.get("missing") is None
+    assert second.as_record()["id"] == 2
+
+
+def test_from_dict_is_lazy():
+    data = {
+        "action": "I",
+        "schema": "public",
+        "table": "users",
+        "columns": [{"name": "id", "type": "bigint", "value": 1}],
+    }
+    output = Wal2JsonOutput.from_dict(data)
+    assert output._change is None
+
+    change = output.change[0]
+    assert change.columnvalues == [1]
+    # Built once and reused afterwards
+    assert output.change[0] is change
+    assert output == Wal2JsonOutput(change=[change])
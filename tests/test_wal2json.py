@@ -1,5 +1,7 @@
+import io
 import os
 import time
+import uuid
 from typing import Any, Dict, List
 
 import psycopg2
@@ -22,6 +24,25 @@ if not TEST_DSN:
     TEST_DSN = f"postgresql://{TEST_CONFIG['user']}:{TEST_CONFIG['password']}@{TEST_CONFIG['host']}:{TEST_CONFIG['port']}/{TEST_CONFIG['database']}"
 
 
+def copy_users(cur, count: int) -> List[int]:
+    """Bulk-load users with random values via COPY and return their ids."""
+    # Reserve all ids in one round trip; COPY writes identity values as given
+    cur.execute(
+        "SELECT nextval(pg_get_serial_sequence('users', 'id')) FROM generate_series(1, %s)",
+        (count,)
+    )
+    ids = [row[0] for row in cur.fetchall()]
+    buf = io.StringIO()
+    for user_id in ids:
+        buf.write(f"{user_id},{uuid.uuid4().hex},{uuid.uuid4().hex},{uuid.uuid4().hex},{uuid.uuid4().hex}\n")
+    buf.seek(0)
+    cur.copy_expert(
+        "COPY users(id, firstname, lastname, email, phone) FROM STDIN WITH (FORMAT csv)",
+        buf
+    )
+    return ids
+
+
 @pytest.fixture(scope="session")
 def pg_client():
     conn = psycopg2.connect(TEST_DSN)
@@ -49,11 +70,7 @@ def setup_database(pg_client):
         cur.execute("ALTER TABLE users REPLICA IDENTITY FULL;")
         
         # Insert initial test data
-        cur.execute("""
-        INSERT INTO users(firstname, lastname, email, phone)
-        SELECT md5(RANDOM()::TEXT), md5(RANDOM()::TEXT), md5(RANDOM()::TEXT), md5(RANDOM()::TEXT) 
-        FROM generate_series(1, 100);
-        """)
+        copy_users(cur, 100)
         
     pg_client.commit()
 
@@ -68,7 +85,7 @@ def test_insert_and_delete():
                 "kind": change.kind,
                 "schema": change.schema,
                 "table": change.table,
-                "data": dict(zip(change.columnnames, change.columnvalues))
+                "data": change.as_record()
             })
 
     # Create a test connection first to ensure the database is ready
@@ -115,14 +132,7 @@ def test_insert_and_delete():
         # Insert test data and remember the IDs
         inserted_ids = []
         with test_conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO users(firstname, lastname, email, phone)
-                SELECT md5(random()::text), md5(random()::text),
-                       md5(random()::text), md5(random()::text)
-                FROM generate_series(1, 5)
-                RETURNING id
-            """)
-            inserted_ids = [row[0] for row in cur.fetchall()]
+            inserted_ids = copy_users(cur, 5)
             test_conn.commit()
 
         # Wait for changes to be processed
@@ -161,7 +171,7 @@ def test_update():
                 "kind": change.kind,
                 "schema": change.schema,
                 "table": change.table,
-                "data": dict(zip(change.columnnames, change.columnvalues))
+                "data": change.as_record()
             })
 
     # Create a test connection first to ensure the database is ready
@@ -187,14 +197,7 @@ def test_update():
         # First insert some test data and remember the IDs
         inserted_ids = []
         with test_conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO users(firstname, lastname, email, phone)
-                SELECT md5(random()::text), md5(random()::text),
-                       md5(random()::text), md5(random()::text)
-                FROM generate_series(1, 10)
-                RETURNING id
-            """)
-            inserted_ids = [row[0] for row in cur.fetchall()]
+            inserted_ids = copy_users(cur, 10)
             test_conn.commit()
 
         client = LogicalReplicationClient(